@@ -1,57 +1,114 @@
 
 from pptx import Presentation
 from pptx.enum.shapes import PP_PLACEHOLDER, MSO_SHAPE_TYPE
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_PARAGRAPH_ALIGNMENT
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml.ns import qn
+from lxml import etree
+import copy
+import logging
 import os
 import io
-from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+# Enum members bound once at module level - the hot loops below hit these
+# on every shape, and a plain global lookup beats the attribute chain
+_TITLE = PP_PLACEHOLDER.TITLE
+_BODY = PP_PLACEHOLDER.BODY
+_BODY_OR_OBJECT = (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT)
 
 def create_ppt_from_template(slide_data, output_path, template_path=None, template_style=None):
     """
     Creates a NEW PPT file by DUPLICATING template slides and replacing content.
     This preserves ALL visual elements including backgrounds, shapes, and images.
+
+    output_path may be a filesystem path, a writable file-like object, or
+    None to get back an in-memory BytesIO buffer (handy for serving the
+    file over HTTP without touching disk).
     """
-    
+
     if not template_path or not os.path.exists(template_path):
         # No template - create basic presentation
         return create_basic_presentation(slide_data, output_path)
     
     try:
-        # Load template
-        template_prs = Presentation(template_path)
-        
-        # Find the best template slide to use as a base
-        template_slide = find_best_content_slide(template_prs)
-        template_slide_layout = template_slide.slide_layout if template_slide else template_prs.slide_layouts[1]
-        
-        # Create new presentation using the same template
+        # Load the template once - it serves as both the slide source and
+        # the output presentation (parsing a .pptx is the dominant cost)
         new_prs = Presentation(template_path)
-        
+
+        # Find the best template slide to use as a base
+        template_slide = find_best_content_slide(new_prs)
+        template_slide_layout = template_slide.slide_layout if template_slide else new_prs.slide_layouts[1]
+
+        # Capture the template slide's visual elements once, before the
+        # slide list is cleared, so each new slide only pays for a deepcopy
+        visual_templates = snapshot_template_visual_elements(template_slide) if template_slide else []
+
+        # The layout's placeholder structure is fixed - resolve the title
+        # and body idx values once instead of scanning every new slide
+        title_idx, body_idx = find_placeholder_idxs(template_slide_layout)
+
         # Remove all existing slides (keep just the master/layouts)
-        slide_indices = list(range(len(new_prs.slides)))
-        for i in reversed(slide_indices):
-            rId = new_prs.slides._sldIdLst[i].rId
+        sldIdLst = new_prs.slides._sldIdLst
+        rIds = [sldId.rId for sldId in sldIdLst]
+        for rId in rIds:
             new_prs.part.drop_rel(rId)
-            del new_prs.slides._sldIdLst[i]
+        # One C-level call instead of deleting entries one at a time
+        sldIdLst.clear()
         
+        # For large decks, pre-serialize the bullet paragraphs in worker
+        # processes; the slide assembly itself must stay in this process
+        prebuilt_bodies = None
+        if len(slide_data) >= PARALLEL_SLIDE_THRESHOLD:
+            prebuilt_bodies = build_slide_bodies_parallel(slide_data)
+
+        # Recurring bullet lists (footers, repeated blocks) are built once
+        # and deep-copied into each slide that uses them
+        body_cache = {}
+
         # Create new slides by duplicating the template slide structure
-        for slide_content in slide_data:
+        for i, slide_content in enumerate(slide_data):
+            if prebuilt_bodies:
+                points_xml = prebuilt_bodies[i]
+            else:
+                points_key = tuple(slide_content.get("points", []))
+                points_xml = body_cache.get(points_key)
+                if points_xml is None and points_key:
+                    points_xml = build_paragraphs_element(points_key)
+                    body_cache[points_key] = points_xml
+
             new_slide = duplicate_slide_with_content(
-                new_prs, 
-                template_slide_layout, 
-                template_slide,
-                slide_content
+                new_prs,
+                template_slide_layout,
+                visual_templates,
+                slide_content,
+                title_idx,
+                body_idx,
+                points_xml
             )
         
-        new_prs.save(output_path)
-        return output_path
-        
+        return save_presentation(new_prs, output_path)
+
     except Exception as e:
-        print(f"Error with template processing: {e}")
+        logger.warning("Error with template processing: %s", e)
         # Fallback to basic presentation
         return create_basic_presentation(slide_data, output_path)
 
+def save_presentation(prs, output_path):
+    """
+    Save the presentation to a path or writable file-like object.
+    When output_path is None, save into an in-memory BytesIO buffer and
+    return it rewound - no filesystem round-trip for callers that only
+    need the bytes.
+    """
+    if output_path is None:
+        buffer = io.BytesIO()
+        prs.save(buffer)
+        buffer.seek(0)
+        return buffer
+    prs.save(output_path)
+    return output_path
+
 def find_best_content_slide(template_prs):
     """
     Find the best slide from template to use as a base for content slides.
@@ -59,142 +116,142 @@ def find_best_content_slide(template_prs):
     """
     best_slide = None
     best_score = 0
-    
+
     for slide in template_prs.slides:
         score = 0
         has_title = False
         has_content_area = False
-        
+
         for shape in slide.shapes:
             if shape.is_placeholder:
-                if shape.placeholder_format.type == PP_PLACEHOLDER.TITLE:
+                # Cache the placeholder type - each access walks the
+                # underlying XML element
+                ph_type = shape.placeholder_format.type
+                if ph_type == _TITLE:
                     has_title = True
                     score += 2
-                elif shape.placeholder_format.type in (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT):
+                elif ph_type in _BODY_OR_OBJECT:
                     has_content_area = True
                     score += 3
-        
+                # No need to scan remaining shapes once we have both
+                if has_title and has_content_area:
+                    break
+
         # Prefer slides with both title and content
         if has_title and has_content_area:
             score += 5
-            
+            # This is already the ideal slide - stop scanning
+            return slide
+
         if score > best_score:
             best_score = score
             best_slide = slide
-    
+
     return best_slide
 
-def duplicate_slide_with_content(new_prs, layout, template_slide, content):
+def duplicate_slide_with_content(new_prs, layout, visual_templates, content, title_idx=None, body_idx=None, points_xml=None):
     """
     Create a new slide by copying template slide structure and replacing content.
     This preserves ALL visual elements while updating text content.
     """
     # Add new slide using the same layout
     new_slide = new_prs.slides.add_slide(layout)
-    
-    if template_slide:
+
+    if visual_templates:
         # Copy ALL non-placeholder shapes from template slide
-        copy_template_visual_elements(template_slide, new_slide)
-    
+        copy_template_visual_elements(visual_templates, new_slide)
+
     # Now populate the placeholders with our content
-    populate_slide_content(new_slide, content)
-    
+    populate_slide_content(new_slide, content, title_idx, body_idx, points_xml)
+
     return new_slide
 
-def copy_template_visual_elements(template_slide, new_slide):
+def snapshot_template_visual_elements(template_slide):
     """
-    Copy all visual elements (non-placeholder shapes) from template to new slide.
-    This includes backgrounds, decorative shapes, images, logos, etc.
+    Capture the XML of all visual elements (non-placeholder shapes) on the
+    template slide, so they can be cloned into each new slide without
+    re-walking and re-filtering the template shapes every time.
+    Returns a list of (shape element, {rId: image part}) pairs.
     """
+    visual_templates = []
     try:
-        shapes_to_copy = []
-        
-        # Identify all non-placeholder shapes in template
         for shape in template_slide.shapes:
-            if not shape.is_placeholder:
-                shapes_to_copy.append(shape)
-        
-        # Copy each non-placeholder shape
-        for shape in shapes_to_copy:
-            copy_shape_to_slide(shape, new_slide)
-            
+            if shape.is_placeholder:
+                continue
+            element = copy.deepcopy(shape._element)
+            # Map any image references so they can be re-related on the
+            # target slide (covers pictures nested in groups too)
+            image_parts = {}
+            for blip in element.findall('.//' + qn('a:blip')):
+                rId = blip.get(qn('r:embed'))
+                if rId:
+                    image_parts[rId] = template_slide.part.related_part(rId)
+            visual_templates.append((element, image_parts))
+    except Exception as e:
+        logger.warning("Error snapshotting visual elements: %s", e)
+    return visual_templates
+
+def copy_template_visual_elements(visual_templates, new_slide):
+    """
+    Clone the captured visual elements (backgrounds, decorative shapes,
+    images, logos, etc.) onto the new slide. A single deepcopy of the
+    pre-filtered XML replaces python-pptx's shape-by-shape reconstruction.
+    """
+    try:
+        spTree = new_slide.shapes._spTree
+        for element, image_parts in visual_templates:
+            clone = copy.deepcopy(element)
+            for blip in clone.findall('.//' + qn('a:blip')):
+                old_rId = blip.get(qn('r:embed'))
+                if old_rId in image_parts:
+                    new_rId = new_slide.part.relate_to(image_parts[old_rId], RT.IMAGE)
+                    blip.set(qn('r:embed'), new_rId)
+            spTree.append(clone)
+
     except Exception as e:
-        print(f"Error copying visual elements: {e}")
+        logger.warning("Error copying visual elements: %s", e)
 
 def copy_shape_to_slide(source_shape, target_slide):
     """
     Copy a specific shape from source to target slide.
-    Handles different shape types (images, text boxes, shapes, etc.)
+    Dispatches on shape type (images, text boxes, shapes, etc.) via a
+    lookup table; unknown types fall back to generic best-effort copying.
     """
     try:
-        # Handle images
-        if source_shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
-            copy_image_shape(source_shape, target_slide)
-        
-        # Handle text boxes and auto shapes
-        elif source_shape.shape_type in (MSO_SHAPE_TYPE.TEXT_BOX, MSO_SHAPE_TYPE.AUTO_SHAPE):
-            copy_text_or_shape(source_shape, target_slide)
-            
-        # Handle other shape types
-        else:
-            try:
-                # Generic shape copying (best effort)
-                copy_generic_shape(source_shape, target_slide)
-            except:
-                print(f"Could not copy shape type: {source_shape.shape_type}")
-                
+        copier = _SHAPE_COPIERS.get(source_shape.shape_type, copy_generic_shape)
+        copier(source_shape, target_slide)
+
     except Exception as e:
-        print(f"Error copying individual shape: {e}")
+        logger.debug("Error copying individual shape: %s", e)
 
 def copy_image_shape(source_shape, target_slide):
     """Copy an image shape to the target slide."""
     try:
-        # Get image data
-        image_data = source_shape.image.blob
-        image_stream = io.BytesIO(image_data)
-        
-        # Add image to target slide with same position and size
-        pic = target_slide.shapes.add_picture(
-            image_stream,
-            source_shape.left,
-            source_shape.top,
-            source_shape.width,
-            source_shape.height
-        )
-        
-        # Copy any formatting properties if possible
-        if hasattr(source_shape, 'rotation'):
-            pic.rotation = source_shape.rotation
-            
+        # Reuse the existing image part instead of re-adding the bytes -
+        # add_picture() would re-hash the blob and can duplicate media
+        image_part = source_shape.part.related_part(source_shape._element.blip_rId)
+        rId = target_slide.part.relate_to(image_part, RT.IMAGE)
+
+        # Clone the <p:pic> element (keeps position, size, rotation and
+        # all other formatting) and point it at the new relationship
+        pic_el = copy.deepcopy(source_shape._element)
+        pic_el.blipFill.blip.set(qn('r:embed'), rId)
+        target_slide.shapes._spTree.append(pic_el)
+
     except Exception as e:
-        print(f"Could not copy image: {e}")
+        logger.debug("Could not copy image: %s", e)
 
 def copy_text_or_shape(source_shape, target_slide):
     """Copy text boxes or auto shapes to target slide."""
     try:
-        # For text boxes, create a new text box
-        if hasattr(source_shape, 'text'):
-            textbox = target_slide.shapes.add_textbox(
-                source_shape.left,
-                source_shape.top, 
-                source_shape.width,
-                source_shape.height
-            )
-            
-            # Copy text content (but we might override this later)
-            textbox.text = source_shape.text
-            
-            # Copy text formatting if possible
-            if source_shape.text_frame and textbox.text_frame:
-                copy_text_formatting(source_shape.text_frame, textbox.text_frame)
-        
-        # For shapes, try to recreate based on shape type
-        else:
-            # This is more complex - would need shape-specific logic
-            pass
-            
+        # A single deepcopy of the <p:sp> subtree clones the whole shape -
+        # position, fills, effects and run-level text formatting included -
+        # in one C-level operation instead of rebuilding it piece by piece
+        new_el = copy.deepcopy(source_shape._element)
+        target_slide.shapes._spTree.append(new_el)
+
     except Exception as e:
-        print(f"Could not copy text/shape: {e}")
+        logger.debug("Could not copy text/shape: %s", e)
 
 def copy_generic_shape(source_shape, target_slide):
     """Attempt to copy other shape types."""
@@ -204,62 +261,159 @@ def copy_generic_shape(source_shape, target_slide):
         # For now, we'll skip complex shapes to avoid errors
         pass
     except Exception as e:
-        print(f"Could not copy generic shape: {e}")
+        logger.debug("Could not copy generic shape: %s", e)
+
+# Dispatch table for copy_shape_to_slide - add entries here to support
+# more shape types
+_SHAPE_COPIERS = {
+    MSO_SHAPE_TYPE.PICTURE: copy_image_shape,
+    MSO_SHAPE_TYPE.TEXT_BOX: copy_text_or_shape,
+    MSO_SHAPE_TYPE.AUTO_SHAPE: copy_text_or_shape,
+}
+
+# Decks smaller than this aren't worth the process-pool startup cost
+PARALLEL_SLIDE_THRESHOLD = 50
 
-def copy_text_formatting(source_tf, target_tf):
-    """Copy text formatting from source to target text frame."""
+_A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+
+def build_paragraphs_element(points):
+    """
+    Build a wrapper element holding one <a:p> paragraph per bullet point.
+    The wrapper can be cached and its paragraphs deep-copied into any
+    number of text frames.
+    """
+    wrapper = etree.Element('paragraphs', nsmap={'a': _A_NS})
+    for point_text in points:
+        p = etree.SubElement(wrapper, qn('a:p'))
+        r = etree.SubElement(p, qn('a:r'))
+        t = etree.SubElement(r, qn('a:t'))
+        t.text = point_text
+    return wrapper
+
+def build_paragraphs_xml(points):
+    """
+    Serialize a set of bullet points to <a:p> paragraph XML bytes.
+    Pure data-in/bytes-out, so it can run in a worker process; the caller
+    parses the result and grafts the paragraphs onto a txBody.
+    """
+    return etree.tostring(build_paragraphs_element(points))
+
+def build_slide_bodies_parallel(slide_data):
+    """
+    Pre-serialize every slide's bullet paragraphs across a process pool.
+    Returns a list aligned with slide_data, or None when a pool cannot be
+    used (the caller then builds the paragraphs serially).
+    """
     try:
-        # Copy paragraph-level formatting
-        for src_para, tgt_para in zip(source_tf.paragraphs, target_tf.paragraphs):
-            if hasattr(src_para, 'alignment'):
-                tgt_para.alignment = src_para.alignment
-            if hasattr(src_para, 'font'):
-                if src_para.font.name:
-                    tgt_para.font.name = src_para.font.name
-                if src_para.font.size:
-                    tgt_para.font.size = src_para.font.size
-                    
+        from multiprocessing import Pool
+        with Pool() as pool:
+            return pool.map(
+                build_paragraphs_xml,
+                [tuple(content.get("points", [])) for content in slide_data]
+            )
     except Exception as e:
-        print(f"Could not copy text formatting: {e}")
+        logger.warning("Process pool unavailable, building slides serially: %s", e)
+        return None
+
+def set_bullet_points_xml(text_frame, paragraphs_xml):
+    """
+    Graft prebuilt paragraphs onto a text frame, replacing its existing
+    paragraphs. Accepts either serialized bytes (from build_paragraphs_xml,
+    e.g. out of a worker process) or a parsed wrapper element (from
+    build_paragraphs_element), whose paragraphs are deep-copied so the
+    wrapper can be reused across slides.
+    """
+    if isinstance(paragraphs_xml, bytes):
+        paragraphs = list(etree.fromstring(paragraphs_xml))
+    else:
+        paragraphs = [copy.deepcopy(p) for p in paragraphs_xml]
+
+    txBody = text_frame._txBody
+    for p in txBody.findall(qn('a:p')):
+        txBody.remove(p)
+
+    for p in paragraphs:
+        txBody.append(p)
 
-def populate_slide_content(slide, content):
+    if txBody.find(qn('a:p')) is None:
+        # A txBody must contain at least one paragraph
+        etree.SubElement(txBody, qn('a:p'))
+
+def set_bullet_points(text_frame, points):
+    """
+    Replace a text frame's paragraphs with one bullet per point.
+    Builds the <a:p> elements directly on the underlying txBody in one
+    pass instead of calling add_paragraph() per point, which goes through
+    python-pptx's Paragraph/Run wrappers each time.
+    """
+    txBody = text_frame._txBody
+    for p in txBody.findall(qn('a:p')):
+        txBody.remove(p)
+
+    for point_text in points:
+        p = etree.SubElement(txBody, qn('a:p'))
+        r = etree.SubElement(p, qn('a:r'))
+        t = etree.SubElement(r, qn('a:t'))
+        t.text = point_text
+
+    if not points:
+        # A txBody must contain at least one paragraph
+        etree.SubElement(txBody, qn('a:p'))
+
+def find_placeholder_idxs(layout):
+    """
+    Determine the idx values of the title and body placeholders on a layout.
+    Every slide built from the layout shares the same placeholder structure,
+    so this only needs to run once per template.
+    """
+    title_idx = None
+    body_idx = None
+    for ph in layout.placeholders:
+        ph_type = ph.placeholder_format.type
+        if ph_type == _TITLE and title_idx is None:
+            title_idx = ph.placeholder_format.idx
+        elif ph_type in _BODY_OR_OBJECT and body_idx is None:
+            body_idx = ph.placeholder_format.idx
+    return title_idx, body_idx
+
+def populate_slide_content(slide, content, title_idx=None, body_idx=None, points_xml=None):
     """
     Populate slide placeholders with our generated content.
     Only updates placeholder text, leaves all other elements intact.
+    When the placeholder idx values are known (precomputed from the layout)
+    they are used directly, skipping the per-shape type scan.
     """
     title = content.get("title", "")
     points = content.get("points", [])
-    
+
     # Find and populate title placeholder
     title_shape = None
     content_shape = None
-    
-    for shape in slide.shapes:
-        if shape.is_placeholder:
-            if shape.placeholder_format.type == PP_PLACEHOLDER.TITLE:
-                title_shape = shape
-            elif shape.placeholder_format.type in (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT):
-                content_shape = shape
-    
+
+    if title_idx is not None or body_idx is not None:
+        # Placeholder lookup is by idx, not position - build the map once
+        phs = {ph.placeholder_format.idx: ph for ph in slide.placeholders}
+        title_shape = phs.get(title_idx)
+        content_shape = phs.get(body_idx)
+    else:
+        for shape in slide.shapes:
+            if shape.is_placeholder:
+                ph_type = shape.placeholder_format.type
+                if ph_type == _TITLE:
+                    title_shape = shape
+                elif ph_type in _BODY_OR_OBJECT:
+                    content_shape = shape
+
     # Set title
     if title_shape and title:
         title_shape.text = title
     
     # Set content points
     if content_shape and points:
-        tf = content_shape.text_frame
-        tf.clear()
-        
-        # Add first point
-        if points:
-            p = tf.paragraphs[0]
-            p.text = points[0]
-            
-            # Add remaining points
-            for point_text in points[1:]:
-                new_para = tf.add_paragraph()
-                new_para.text = point_text
-                new_para.level = 0
+        if points_xml is not None:
+            set_bullet_points_xml(content_shape.text_frame, points_xml)
+        else:
+            set_bullet_points(content_shape.text_frame, points)
 
 def create_basic_presentation(slide_data, output_path):
     """
@@ -269,33 +423,27 @@ def create_basic_presentation(slide_data, output_path):
     
     # Use default layout
     layout = prs.slide_layouts[1] if len(prs.slide_layouts) > 1 else prs.slide_layouts[0]
-    
+
+    # Resolve the body placeholder idx once from the layout - every slide
+    # shares its placeholder structure, so no per-slide scan is needed
+    body_idx = None
+    for ph in layout.placeholders:
+        if ph.placeholder_format.type == _BODY:
+            body_idx = ph.placeholder_format.idx
+            break
+
     for content in slide_data:
         slide = prs.slides.add_slide(layout)
-        
+
         # Set title
         if slide.shapes.title:
             slide.shapes.title.text = content.get("title", "")
-        
+
         # Set content
-        for shape in slide.placeholders:
-            if shape.placeholder_format.type == PP_PLACEHOLDER.BODY:
-                tf = shape.text_frame
-                tf.clear()
-                
-                points = content.get("points", [])
-                if points:
-                    p = tf.paragraphs[0]
-                    p.text = points[0]
-                    
-                    for point_text in points[1:]:
-                        new_p = tf.add_paragraph()
-                        new_p.text = point_text
-                        new_p.level = 0
-                break
-    
-    prs.save(output_path)
-    return output_path
+        if body_idx is not None:
+            set_bullet_points(slide.placeholders[body_idx].text_frame, content.get("points", []))
+
+    return save_presentation(prs, output_path)
 
 
 